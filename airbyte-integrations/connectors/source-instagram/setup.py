@@ -11,6 +11,7 @@ MAIN_REQUIREMENTS = [
     "facebook_business~=11.0",
     "pendulum>=2,<3",
     "backoff",
+    "orjson>=3.6,<4",
 ]
 
 TEST_REQUIREMENTS = [
@@ -2,20 +2,27 @@
 # Copyright (c) 2022 Airbyte, Inc., all rights reserved.
 #
 
-import json
-from time import sleep
-from typing import Any, List, Mapping
+import logging
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from threading import Event, Lock
+from time import monotonic
+from typing import Any, Callable, Deque, Iterable, Iterator, List, Mapping, Optional
 
 import backoff
-import pendulum
-from airbyte_cdk.entrypoint import logger
 from cached_property import cached_property
 from facebook_business import FacebookAdsApi
 from facebook_business.adobjects import user as fb_user
 from facebook_business.adobjects.iguser import IGUser
 from facebook_business.adobjects.page import Page
 from facebook_business.exceptions import FacebookRequestError
-from source_instagram.common import InstagramAPIException, retry_pattern
+from requests.adapters import HTTPAdapter
+from source_instagram.common import InstagramAPIException, emit_logs, log, logger, retry_pattern, run_with_deferred_logs
+
+try:
+    import orjson as json
+except ImportError:  # pragma: no cover
+    import json  # type: ignore[no-redef]
 
 backoff_policy = retry_pattern(backoff.expo, FacebookRequestError, max_tries=7, factor=5)
 
@@ -24,27 +31,56 @@ class MyFacebookAdsApi(FacebookAdsApi):
     """Custom Facebook API class to intercept all API calls and handle call rate limits"""
 
     call_rate_threshold = 90  # maximum percentage of call limit utilization
-    pause_interval = pendulum.duration(minutes=1)  # default pause interval if reached or close to call rate limit
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # the api instance is shared by worker threads, so a pause requested by one of them holds back all of them:
+        # calls are not made before this moment (in terms of time.monotonic)
+        self._resume_at = 0.0
+        self._pause_lock = Lock()
+        # set when the sync is over, calls still running in worker threads end instead of waiting or retrying
+        self._stopped = Event()
 
     @staticmethod
     def parse_call_rate_header(headers):
         call_count = 0
-        pause_interval = pendulum.duration()
+        pause_seconds = 0.0
 
         usage_header = headers.get("x-business-use-case-usage") or headers.get("x-app-usage") or headers.get("x-ad-account-usage")
-        if usage_header:
+        # header is parsed only if it can change something, it comes with every response
+        if usage_header and any(key in usage_header for key in ("call_count", "acc_id_util_pct", "estimated_time_to_regain_access")):
             usage_header = json.loads(usage_header)
             call_count = usage_header.get("call_count") or usage_header.get("acc_id_util_pct") or 0
-            pause_interval = pendulum.duration(minutes=usage_header.get("estimated_time_to_regain_access", 0))
+            pause_seconds = float(usage_header.get("estimated_time_to_regain_access", 0)) * 60.0
 
-        return call_count, pause_interval
+        return call_count, pause_seconds
 
     def handle_call_rate_limit(self, response, params):
         headers = response.headers()
-        call_count, pause_interval = self.parse_call_rate_header(headers)
-        if call_count > self.call_rate_threshold or pause_interval:
-            logger.warn(f"Utilization is too high ({call_count})%, pausing for {pause_interval}")
-            sleep(pause_interval.total_seconds())
+        call_count, pause_seconds = self.parse_call_rate_header(headers)
+        if call_count > self.call_rate_threshold or pause_seconds:
+            log(logger, logging.WARNING, f"Utilization is too high ({call_count})%, pausing for {pause_seconds} seconds")
+        # without estimated time to regain access calls go on, they are throttled by backoff_policy if the limit is hit
+        if pause_seconds:
+            with self._pause_lock:
+                self._resume_at = max(self._resume_at, monotonic() + pause_seconds)
+
+    def wait_for_resume(self):
+        """Sleep until the pause requested because of high utilization is over"""
+        delay = self._resume_at - monotonic()
+        while delay > 0:
+            if self._stopped.wait(delay):
+                break
+            # the pause could be extended by another thread in the meantime
+            delay = self._resume_at - monotonic()
+
+    def stop(self):
+        """Make pending and following calls fail at once, so nothing holds worker threads"""
+        self._stopped.set()
+
+    def _check_not_stopped(self):
+        if self._stopped.is_set():
+            raise InstagramAPIException("API calls are stopped")
 
     @backoff_policy
     def call(
@@ -58,33 +94,89 @@ class MyFacebookAdsApi(FacebookAdsApi):
         api_version=None,
     ):
         """Makes an API call, delegate actual work to parent class and handles call rates"""
-        response = super().call(method, path, params, headers, files, url_override, api_version)
+        self.wait_for_resume()
+        self._check_not_stopped()
+        try:
+            response = super().call(method, path, params, headers, files, url_override, api_version)
+        except FacebookRequestError:
+            # not retried by backoff_policy after the stop
+            self._check_not_stopped()
+            raise
         self.handle_call_rate_limit(response, params)
         return response
 
 
+class Task:
+    """Call scheduled on the thread pool, log messages of the call are written by the thread that takes its result"""
+
+    def __init__(self, future: Future):
+        self._future = future
+
+    def result(self) -> Any:
+        messages, result, error = self._future.result()
+        emit_logs(messages)
+        if error:
+            raise error
+        return result
+
+    def cancel(self) -> bool:
+        return self._future.cancel()
+
+
 class InstagramAPI:
-    def __init__(self, access_token: str):
+    max_workers = 8  # default number of concurrent API calls
+
+    def __init__(self, access_token: str, max_workers: Optional[int] = None):
         self._api = FacebookAdsApi.init(access_token=access_token)
         # design flaw in MyFacebookAdsApi requires such strange set of new default api instance
         self.api = MyFacebookAdsApi.init(access_token=access_token, crash_log=False)
         FacebookAdsApi.set_default_api(self.api)
+        self.max_workers = max_workers or self.max_workers
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        # keep an open connection for every thread that makes calls, the default pool holds only 10 of them:
+        # the worker threads, the main thread and the thread that reads records ahead of the main one
+        self.api._session.requests.mount("https://", HTTPAdapter(pool_maxsize=self.max_workers + 2))
 
     @cached_property
     def accounts(self) -> List[Mapping[str, Any]]:
         return self._find_accounts()
 
+    def submit(self, func: Callable, *args, **kwargs) -> Task:
+        """Schedule func to be executed on the thread pool"""
+        return Task(self._executor.submit(run_with_deferred_logs, func, *args, **kwargs))
+
+    def close(self):
+        """Stop calls of worker threads and shut down the thread pool without waiting for them"""
+        self.api.stop()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def map_concurrently(self, func: Callable, items: Iterable) -> Iterator:
+        """Apply func to every item using the thread pool, results are yielded in the same order as items.
+        No more than max_workers calls are pending at the same time, so items are consumed lazily.
+        """
+        pending: Deque[Task] = deque()
+        try:
+            for item in items:
+                pending.append(self.submit(func, item))
+                if len(pending) >= self.max_workers:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            for future in pending:
+                future.cancel()
+
     def _find_accounts(self) -> List[Mapping[str, Any]]:
         try:
             instagram_business_accounts = []
-            accounts = fb_user.User(fbid="me").get_accounts()
+            # linked business account is expanded in the same request, pages without it don't have Instagram account
+            accounts = fb_user.User(fbid="me").get_accounts(fields=[Page.Field.instagram_business_account])
             for account in accounts:
-                page = Page(account.get_id()).api_get(fields=["instagram_business_account"])
-                if page.get("instagram_business_account"):
+                if account.get("instagram_business_account"):
                     instagram_business_accounts.append(
                         {
                             "page_id": account.get_id(),
-                            "instagram_business_account": IGUser(page.get("instagram_business_account").get("id")),
+                            "instagram_business_account": IGUser(account.get("instagram_business_account").get("id")),
                         }
                     )
         except FacebookRequestError as exc:
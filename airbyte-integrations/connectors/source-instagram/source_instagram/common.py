@@ -3,15 +3,66 @@
 #
 
 
+import logging
+import re
 import sys
-import urllib.parse as urlparse
+from functools import lru_cache
+from queue import Full, Queue
+from threading import Event, Thread, local
+from typing import Any, Callable, Iterable, Iterator, List, NamedTuple, Optional, Pattern, Tuple, TypeVar, cast
 
 import backoff
-from airbyte_cdk.logger import AirbyteLogger
 from facebook_business.exceptions import FacebookRequestError
+from pendulum import parser
+from pendulum.datetime import DateTime
 from requests.status_codes import codes as status_codes
 
-logger = AirbyteLogger()
+logger = logging.getLogger("airbyte")
+
+T = TypeVar("T")
+
+
+class LogMessage(NamedTuple):
+    """Log message of a background thread, it is written by the thread that consumes the results"""
+
+    logger: logging.Logger
+    level: int
+    message: str
+
+
+# where log messages of the current thread go instead of the output, not set for the thread that reads records
+_deferred_logs = local()
+
+
+def log(logger: logging.Logger, level: int, message: str):
+    """Log message from any thread of connector. The entrypoint prints records with separate writes of the message
+    and the line break, so only the thread that reads records may write to stdout, other threads pass their messages on.
+    """
+    sink = getattr(_deferred_logs, "sink", None)
+    if sink is None:
+        logger.log(level, message)
+    else:
+        sink(LogMessage(logger, level, message))
+
+
+def run_with_deferred_logs(func: Callable, *args, **kwargs) -> Tuple[List[LogMessage], Any, Optional[Exception]]:
+    """Run func in a worker thread, return log messages of the call together with its result or error,
+    the caller logs the messages with emit_logs
+    """
+    messages: List[LogMessage] = []
+    _deferred_logs.sink = messages.append
+    try:
+        return messages, func(*args, **kwargs), None
+    except Exception as exc:
+        return messages, None, exc
+    finally:
+        _deferred_logs.sink = None
+
+
+def emit_logs(messages: Iterable[LogMessage]):
+    """Log messages passed on by another thread, as if they were logged by the current one"""
+    for message in messages:
+        log(*message)
 
 
 class InstagramAPIException(Exception):
@@ -25,8 +76,12 @@ class InstagramExpectedError(InstagramAPIException):
 def retry_pattern(backoff_type, exception, **wait_gen_kwargs):
     def log_retry_attempt(details):
         _, exc, _ = sys.exc_info()
-        logger.info(str(exc))
-        logger.info(f"Caught retryable error after {details['tries']} tries. Waiting {details['wait']} more seconds then retrying...")
+        log(logger, logging.INFO, str(exc))
+        log(
+            logger,
+            logging.INFO,
+            f"Caught retryable error after {details['tries']} tries. Waiting {details['wait']} more seconds then retrying...",
+        )
 
     def should_retry_api_error(exc: FacebookRequestError):
         # Retryable OAuth Error Codes
@@ -66,15 +121,92 @@ def retry_pattern(backoff_type, exception, **wait_gen_kwargs):
         exception,
         jitter=None,
         on_backoff=log_retry_attempt,
+        # retries are logged by log_retry_attempt, the backoff logger would write from any thread
+        logger=None,
         giveup=lambda exc: not should_retry_api_error(exc),
         **wait_gen_kwargs,
     )
 
 
-def remove_params_from_url(url, params):
-    parsed = urlparse.urlparse(url)
-    query = urlparse.parse_qs(parsed.query, keep_blank_values=True)
-    filtered = dict((k, v) for k, v in query.items() if k not in params)
-    return urlparse.urlunparse(
-        [parsed.scheme, parsed.netloc, parsed.path, parsed.params, urlparse.urlencode(filtered, doseq=True), parsed.fragment]
-    )
+@lru_cache(maxsize=4096)
+def parse_datetime(value: str) -> DateTime:
+    """Parse datetime string of state or record, the same values are parsed again and again during sync"""
+    # values are datetimes, parser tells only that it could be any of date, time, datetime or duration
+    return cast(DateTime, parser.parse(value))
+
+
+# repeated parameter separators left after removing parameters or sent by the API itself
+EMPTY_PARAMS_PATTERN = re.compile(r"&{2,}")
+
+
+@lru_cache(maxsize=None)
+def _params_pattern(params: Tuple[str, ...]) -> Pattern:
+    """Compiled pattern that matches `name` or `name=value` pairs of the given params in a query string"""
+    return re.compile(r"(?<![^&])(?:{})(?:=[^&]*)?(?![^&])".format("|".join(map(re.escape, params))))
+
+
+def remove_params_from_url(url: str, params: Iterable[str]) -> str:
+    """Remove params from the query string of url and drop empty params, the rest of url is kept as is"""
+    if "?" not in url:
+        return url
+
+    url, hash_sign, fragment = url.partition("#")
+    base, question_mark, query = url.partition("?")
+    params = tuple(params)
+    if params and any(param in query for param in params):
+        query = _params_pattern(params).sub("", query)
+    query = EMPTY_PARAMS_PATTERN.sub("&", query).strip("&")
+
+    return f"{base}{'?' if query else ''}{query}{hash_sign}{fragment}"
+
+
+# marks the end of items in the buffer
+_END_OF_ITEMS = object()
+
+
+def buffered(iterable: Iterable[T], maxsize: int = 200) -> Iterator[T]:
+    """Read items of iterable in a background thread, so the next items are requested from the API
+    while the consumer processes the ones already read. At most maxsize items are read ahead,
+    errors of the producer are raised to the consumer, its log messages are logged by the consumer in line with items.
+    """
+    buffer: Queue = Queue(maxsize=maxsize)
+    stopped = Event()
+    errors = []
+
+    def put(item) -> bool:
+        while not stopped.is_set():
+            try:
+                buffer.put(item, timeout=0.1)
+                return True
+            except Full:
+                continue
+        return False
+
+    def produce():
+        _deferred_logs.sink = put
+        iterator = iter(iterable)
+        try:
+            for item in iterator:
+                if not put(item):
+                    break
+        except Exception as exc:
+            errors.append(exc)
+        finally:
+            if hasattr(iterator, "close"):
+                iterator.close()
+            put(_END_OF_ITEMS)
+
+    producer = Thread(target=produce, daemon=True)
+    producer.start()
+    try:
+        # the producer always ends with the marker, even if it failed
+        for item in iter(buffer.get, _END_OF_ITEMS):
+            if isinstance(item, LogMessage):
+                log(*item)
+            else:
+                yield item
+        if errors:
+            raise errors[0]
+    finally:
+        # the consumer could stop early, the producer must not be blocked forever by the full buffer
+        stopped.set()
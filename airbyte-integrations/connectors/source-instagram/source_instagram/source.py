@@ -4,7 +4,7 @@
 
 import logging
 from datetime import datetime
-from typing import Any, Iterator, List, Mapping, MutableMapping, Tuple
+from typing import Any, Iterator, List, Mapping, MutableMapping, Optional, Tuple
 
 from airbyte_cdk.models import (
     AirbyteMessage,
@@ -16,9 +16,18 @@ from airbyte_cdk.models import (
 )
 from airbyte_cdk.sources import AbstractSource
 from airbyte_cdk.sources.streams import Stream
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, PositiveInt
 from source_instagram.api import InstagramAPI
-from source_instagram.streams import Media, MediaInsights, Stories, StoryInsights, UserInsights, UserLifetimeInsights, Users
+from source_instagram.streams import (
+    InstagramStream,
+    Media,
+    MediaInsights,
+    Stories,
+    StoryInsights,
+    UserInsights,
+    UserLifetimeInsights,
+    Users,
+)
 
 
 class ConnectorConfig(BaseModel):
@@ -36,8 +45,25 @@ class ConnectorConfig(BaseModel):
         airbyte_secret=True,
     )
 
+    page_size: Optional[PositiveInt] = Field(
+        title="Page Size of Requests",
+        default=InstagramStream.page_size,
+        description="Number of records per page requested from Instagram API. Most users do not need to set this field unless they specifically need to tune the connector to address specific issues or use cases.",
+    )
+
+    max_workers: Optional[PositiveInt] = Field(
+        title="Maximum Concurrent Requests",
+        default=InstagramAPI.max_workers,
+        description="Maximum number of requests sent to Instagram API at the same time. Most users do not need to set this field unless they specifically need to tune the connector to address specific issues or use cases.",
+    )
+
 
 class SourceInstagram(AbstractSource):
+    def __init__(self):
+        super().__init__()
+        # API clients of the streams, their thread pools are shut down when the sync is over
+        self._apis: List[InstagramAPI] = []
+
     def check_connection(self, logger, config: Mapping[str, Any]) -> Tuple[bool, Any]:
         """Connection check to validate that the user-provided config can be used to connect to the underlying API
 
@@ -47,6 +73,7 @@ class SourceInstagram(AbstractSource):
         """
         ok = False
         error_msg = None
+        api = None
 
         try:
             config = ConnectorConfig.parse_obj(config)  # FIXME: this will be not need after we fix CDK
@@ -55,6 +82,9 @@ class SourceInstagram(AbstractSource):
             ok = True
         except Exception as exc:
             error_msg = repr(exc)
+        finally:
+            if api:
+                api.close()
 
         return ok, error_msg
 
@@ -65,7 +95,12 @@ class SourceInstagram(AbstractSource):
             state_key = str(stream.name)
             if state and state_key in state and hasattr(stream, "upgrade_state_to_latest_format"):
                 state[state_key] = stream.upgrade_state_to_latest_format(state[state_key])
-        return super().read(logger, config, catalog, state)
+        try:
+            yield from super().read(logger, config, catalog, state)
+        finally:
+            # calls still running in worker threads would hold the process after a failed sync
+            while self._apis:
+                self._apis.pop().close()
 
     def streams(self, config: Mapping[str, Any]) -> List[Stream]:
         """Discovery method, returns available streams
@@ -73,16 +108,17 @@ class SourceInstagram(AbstractSource):
         :param config: A Mapping of the user input configuration as defined in the connector spec.
         """
         config: ConnectorConfig = ConnectorConfig.parse_obj(config)  # FIXME: this will be not need after we fix CDK
-        api = InstagramAPI(access_token=config.access_token)
+        api = InstagramAPI(access_token=config.access_token, max_workers=config.max_workers)
+        self._apis.append(api)
 
         return [
-            Media(api=api),
-            MediaInsights(api=api),
-            Stories(api=api),
-            StoryInsights(api=api),
-            Users(api=api),
-            UserLifetimeInsights(api=api),
-            UserInsights(api=api, start_date=config.start_date),
+            Media(api=api, page_size=config.page_size),
+            MediaInsights(api=api, page_size=config.page_size),
+            Stories(api=api, page_size=config.page_size),
+            StoryInsights(api=api, page_size=config.page_size),
+            Users(api=api, page_size=config.page_size),
+            UserLifetimeInsights(api=api, page_size=config.page_size),
+            UserInsights(api=api, start_date=config.start_date, page_size=config.page_size),
         ]
 
     def spec(self, *args, **kwargs) -> ConnectorSpecification:
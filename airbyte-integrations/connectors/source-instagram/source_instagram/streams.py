@@ -3,19 +3,25 @@
 #
 
 import copy
-from abc import ABC
+import logging
+from abc import ABC, abstractmethod
 from datetime import datetime
-from typing import Any, Iterable, List, Mapping, MutableMapping, Optional
+from functools import partial
+from itertools import islice
+from time import sleep
+from typing import Any, Callable, Generator, Iterable, Iterator, List, Mapping, MutableMapping, Optional, Union
 
 import pendulum
 from airbyte_cdk.models import SyncMode
 from airbyte_cdk.sources.streams import Stream
 from cached_property import cached_property
 from facebook_business.adobjects.igmedia import IGMedia
+from facebook_business.adobjects.iguser import IGUser
+from facebook_business.api import Cursor, FacebookRequest, FacebookResponse
 from facebook_business.exceptions import FacebookRequestError
-from source_instagram.api import InstagramAPI
+from source_instagram.api import InstagramAPI, backoff_policy
 
-from .common import remove_params_from_url
+from .common import buffered, log, parse_datetime, remove_params_from_url
 
 
 class InstagramStream(Stream, ABC):
@@ -23,22 +29,109 @@ class InstagramStream(Stream, ABC):
 
     page_size = 100
     primary_key = "id"
-
-    def __init__(self, api: InstagramAPI, **kwargs):
+    # maximum number of requests that Graph API accepts in one batch
+    max_batch_size = 50
+    # seconds before errors accepted by keep_error are retried once, the same as the first wait of backoff_policy
+    kept_error_retry_interval = 5
+    # schemas loaded from disk, shared by all instances of the same stream class
+    _json_schemas: MutableMapping[type, Mapping[str, Any]] = {}
+    # fields of schema that are added by connector and can't be requested from the API
+    NON_OBJECT_FIELDS = frozenset(["page_id", "business_account_id"])
+
+    def __init__(self, api: InstagramAPI, page_size: Optional[int] = None, **kwargs):
         super().__init__(**kwargs)
         self._api = api
+        # bigger pages mean fewer round-trips but more records held in memory at once
+        self.page_size = page_size or self.page_size
 
     @cached_property
     def fields(self) -> List[str]:
         """List of fields that we want to query, for now just all properties from stream's schema"""
-        non_object_fields = ["page_id", "business_account_id"]
-        fields = list(self.get_json_schema().get("properties", {}).keys())
-        return list(set(fields) - set(non_object_fields))
+        properties = self._get_class_json_schema().get("properties", {})
+        return [field for field in properties if field not in self.NON_OBJECT_FIELDS]
+
+    def _get_class_json_schema(self) -> Mapping[str, Any]:
+        """Load schema of the stream class once, callers must not modify it"""
+        stream_class = type(self)
+        if stream_class not in self._json_schemas:
+            self._json_schemas[stream_class] = super().get_json_schema()
+        return self._json_schemas[stream_class]
+
+    def get_json_schema(self) -> Mapping[str, Any]:
+        return copy.deepcopy(self._get_class_json_schema())
 
     def upgrade_state_to_latest_format(self, state: MutableMapping[str, Any]) -> MutableMapping[str, Any]:
         """Upgrade state to latest format and return new state object"""
         return copy.deepcopy(state)
 
+    def execute_in_batch(
+        self, pending_requests: List[FacebookRequest], keep_error: Optional[Callable[[FacebookRequestError], bool]] = None
+    ) -> Generator[Union[MutableMapping[str, Any], FacebookRequestError], None, None]:
+        """Execute list of requests in batches, responses are returned in the same order as requests.
+        Errors accepted by keep_error are returned in place of the response of failed request, other errors are raised.
+        """
+        batches = [pending_requests[i : i + self.max_batch_size] for i in range(0, len(pending_requests), self.max_batch_size)]
+        for responses in self._api.map_concurrently(partial(self._execute_batch, keep_error=keep_error), batches):
+            yield from responses
+
+    def _execute_batch(
+        self, pending_requests: List[FacebookRequest], keep_error: Optional[Callable[[FacebookRequestError], bool]] = None
+    ) -> List[Union[MutableMapping[str, Any], FacebookRequestError]]:
+        """Execute one batch, requests with errors accepted by keep_error are retried once after a pause,
+        the error is returned only if it happens again
+        """
+        responses: List[Union[MutableMapping[str, Any], FacebookRequestError]] = self._execute_batch_once(
+            pending_requests, keep_error=keep_error
+        )
+        failed = [index for index, response in enumerate(responses) if isinstance(response, FacebookRequestError)]
+        if failed:
+            log(self.logger, logging.INFO, f"Retry {len(failed)} requests in batch in {self.kept_error_retry_interval} seconds")
+            sleep(self.kept_error_retry_interval)
+            retried = self._execute_batch_once([pending_requests[index] for index in failed], keep_error=keep_error)
+            for index, response in zip(failed, retried):
+                responses[index] = response
+        return responses
+
+    @backoff_policy
+    def _execute_batch_once(
+        self, pending_requests: List[FacebookRequest], keep_error: Optional[Callable[[FacebookRequestError], bool]] = None
+    ) -> List[Union[MutableMapping[str, Any], FacebookRequestError]]:
+        """Execute one batch, retry requests without response once and raise the error of failed ones"""
+        responses: List[Any] = [None] * len(pending_requests)
+        errors = []
+
+        def success(index: int, response: FacebookResponse):
+            responses[index] = response.json()
+
+        def failure(index: int, response: FacebookResponse):
+            error = response.error()
+            if keep_error and keep_error(error):
+                responses[index] = error
+            else:
+                errors.append(error)
+
+        api_batch = self._api.api.new_batch()
+        for index, request in enumerate(pending_requests):
+            api_batch.add_request(request, success=partial(success, index), failure=partial(failure, index))
+
+        api_batch = api_batch.execute()
+        if api_batch:
+            log(self.logger, logging.INFO, "Retry failed requests in batch")
+            api_batch = api_batch.execute()
+        if api_batch:
+            # let backoff_policy wait before the next attempt and give up after its max_tries
+            raise FacebookRequestError(
+                message=f"{len(api_batch)} requests in batch got no response",
+                request_context={},
+                http_status=None,
+                http_headers={},
+                body={"error": {"message": "Requests in batch got no response", "is_transient": True}},
+            )
+
+        if errors:
+            raise errors[0]
+        return responses
+
     def request_params(
         self,
         stream_slice: Mapping[str, Any] = None,
@@ -47,6 +140,29 @@ class InstagramStream(Stream, ABC):
         """Parameters that should be passed to query_records method"""
         return {"limit": self.page_size}
 
+    def get_media_edge(self, ig_account: IGUser, edge: str, fields: List[str]) -> Iterator[IGMedia]:
+        """IG Media objects of account edge (media, stories), the same as IGUser.get_media/get_stories
+        but without asking for the edge summary on each page, we don't use it.
+        """
+        cursor = Cursor(
+            source_object=ig_account,
+            target_objects_class=IGMedia,
+            endpoint=edge,
+            fields=fields,
+            params=self.request_params(),
+            include_summary=False,
+        )
+        yield from self._prefetch_pages(cursor)
+
+    def _prefetch_pages(self, cursor: Cursor) -> Iterator[Any]:
+        """Iterate over objects of cursor, next page is loaded in background while objects of current page are processed"""
+        has_objects = cursor.load_next_page()
+        while has_objects:
+            page = cursor[: len(cursor)]
+            next_page = self._api.submit(cursor.load_next_page)
+            yield from page
+            has_objects = next_page.result()
+
     def stream_slices(
         self, sync_mode: SyncMode, cursor_field: List[str] = None, stream_state: Mapping[str, Any] = None
     ) -> Iterable[Optional[Mapping[str, Any]]]:
@@ -64,6 +180,11 @@ class InstagramStream(Stream, ABC):
     def transform(self, record: MutableMapping[str, Any]) -> MutableMapping[str, Any]:
         return self._clear_url(record)
 
+    @staticmethod
+    def _account_fields(account: Mapping[str, Any]) -> Mapping[str, Any]:
+        """Fields of the account that are added to each of its records, computed once per account"""
+        return {"page_id": account["page_id"], "business_account_id": account["instagram_business_account"].get("id")}
+
     @staticmethod
     def _clear_url(record: MutableMapping[str, Any]) -> MutableMapping[str, Any]:
         """
@@ -71,10 +192,12 @@ class InstagramStream(Stream, ABC):
         _nc_rid is generated every time a new one and ccb can change its value, and tests fail when checking for identity.
         This does not spoil the link, it remains correct and by clicking on it you can view the video or see picture.
         """
-        if record.get("media_url"):
-            record["media_url"] = remove_params_from_url(record["media_url"], params=["_nc_rid"])
-        if record.get("profile_picture_url"):
-            record["profile_picture_url"] = remove_params_from_url(record["profile_picture_url"], params=["ccb"])
+        media_url = record.get("media_url")
+        if media_url and "_nc_rid" in media_url:
+            record["media_url"] = remove_params_from_url(media_url, params=("_nc_rid",))
+        profile_picture_url = record.get("profile_picture_url")
+        if profile_picture_url and "ccb" in profile_picture_url:
+            record["profile_picture_url"] = remove_params_from_url(profile_picture_url, params=("ccb",))
 
         return record
 
@@ -87,6 +210,30 @@ class InstagramIncrementalStream(InstagramStream, ABC):
         self._start_date = pendulum.instance(start_date)
 
 
+class InstagramReadAheadStream(InstagramStream, ABC):
+    """Base class for streams whose records of account are read in a background thread ahead of the ones emitted"""
+
+    # maximum number of records that are read ahead of the ones emitted, 0 reads them in the thread that emits them
+    buffer_size = 200
+
+    def read_records(
+        self,
+        sync_mode: SyncMode,
+        cursor_field: List[str] = None,
+        stream_slice: Mapping[str, Any] = None,
+        stream_state: Mapping[str, Any] = None,
+    ) -> Iterable[Mapping[str, Any]]:
+        records = self._read_records(stream_slice["account"])
+        if self.buffer_size:
+            # records are serialized by the caller while the next pages are read
+            return buffered(records, maxsize=self.buffer_size)
+        return records
+
+    @abstractmethod
+    def _read_records(self, account: Mapping[str, Any]) -> Iterator[MutableMapping[str, Any]]:
+        """Records of one account"""
+
+
 class Users(InstagramStream):
     """Docs: https://developers.facebook.com/docs/instagram-api/reference/ig-user"""
 
@@ -97,11 +244,27 @@ class Users(InstagramStream):
         stream_slice: Mapping[str, Any] = None,
         stream_state: Mapping[str, Any] = None,
     ) -> Iterable[Mapping[str, Any]]:
-        account = stream_slice["account"]
-        ig_account = account["instagram_business_account"]
-        record = ig_account.api_get(fields=self.fields).export_all_data()
-        record["page_id"] = account["page_id"]
-        yield self.transform(record)
+        accounts = stream_slice["accounts"]
+        # Graph API accepts up to 50 ids in one request, the same as in one batch
+        for i in range(0, len(accounts), self.max_batch_size):
+            accounts_chunk = accounts[i : i + self.max_batch_size]
+            users = self._get_users([account["instagram_business_account"].get_id() for account in accounts_chunk])
+            for account in accounts_chunk:
+                record = users[account["instagram_business_account"].get_id()]
+                record["page_id"] = account["page_id"]
+                yield self.transform(record)
+
+    def stream_slices(
+        self, sync_mode: SyncMode, cursor_field: List[str] = None, stream_state: Mapping[str, Any] = None
+    ) -> Iterable[Optional[Mapping[str, Any]]]:
+        """Users of all accounts are requested together, so there is one slice for all of them"""
+        yield {"accounts": self._api.accounts}
+
+    def _get_users(self, ids: List[str]) -> Mapping[str, MutableMapping[str, Any]]:
+        """Get users by ids in one request, response maps each id to its user"""
+        params = {"ids": ",".join(ids), "fields": ",".join(self.fields)}
+        users: Mapping[str, MutableMapping[str, Any]] = self._api.api.call("GET", ("",), params=params).json()
+        return users
 
 
 class UserLifetimeInsights(InstagramStream):
@@ -120,10 +283,10 @@ class UserLifetimeInsights(InstagramStream):
     ) -> Iterable[Mapping[str, Any]]:
         account = stream_slice["account"]
         ig_account = account["instagram_business_account"]
+        account_fields = self._account_fields(account)
         for insight in ig_account.get_insights(params=self.request_params()):
             yield {
-                "page_id": account["page_id"],
-                "business_account_id": ig_account.get("id"),
+                **account_fields,
                 "metric": insight["name"],
                 "date": insight["values"][0]["end_time"],
                 "value": insight["values"][0]["value"],
@@ -158,6 +321,13 @@ class UserInsights(InstagramIncrementalStream):
         "days_28": ["impressions", "reach"],
         "lifetime": ["online_followers"],
     }
+    # metrics of these periods are stored with the period name as suffix, they repeat metrics of "day"
+    SUFFIXED_KEYS = {
+        (name, period): f"{name}_{period}"
+        for period, metrics in METRICS_BY_PERIOD.items()
+        if period in ("week", "days_28")
+        for name in metrics
+    }
 
     primary_key = None
     cursor_field = "date"
@@ -179,33 +349,36 @@ class UserInsights(InstagramIncrementalStream):
     ) -> Iterable[Mapping[str, Any]]:
         account = stream_slice["account"]
         ig_account = account["instagram_business_account"]
-        account_id = ig_account.get("id")
 
         base_params = self.request_params(stream_state=stream_state, stream_slice=stream_slice)
-        insight_list = []
-        # iterate over each period, query insights
-        for period, metrics in self.METRICS_BY_PERIOD.items():
-            params = {
+        params_by_period = [
+            {
                 **base_params,
                 "metric": metrics,
                 "period": [period],
             }
+            for period, metrics in self.METRICS_BY_PERIOD.items()
+        ]
 
-            # we get only first record, because cursor will try to fetch next date interval
-            cursor = ig_account.get_insights(params=params)
-            if len(cursor):
-                insight_list += [insights.export_all_data() for insights in cursor[: len(cursor)]]
+        insight_list = []
+        # query insights of all periods in one batch,
+        # we get only first page of each response, because cursor will try to fetch next date interval
+        pending_requests = [ig_account.get_insights(params=params, pending=True) for params in params_by_period]
+        for response in self.execute_in_batch(pending_requests):
+            insight_list += response.get("data", [])
 
         # end then merge all periods in one record
-        insight_record = {"page_id": account["page_id"], "business_account_id": account_id}
+        cursor_key = self.cursor_field
+        suffixed_keys = self.SUFFIXED_KEYS
+        insight_record = dict(self._account_fields(account))
         for insight in insight_list:
-            key = insight["name"]
-            if insight["period"] in ["week", "days_28"]:
-                key += f"_{insight['period']}"
+            name = insight["name"]
+            key = suffixed_keys.get((name, insight["period"]), name)
 
-            insight_record[key] = insight.get("values")[0]["value"]  # this depends on days_increment value
-            if not insight_record.get(self.cursor_field):
-                insight_record[self.cursor_field] = insight.get("values")[0]["end_time"]
+            value = insight["values"][0]  # this depends on days_increment value
+            insight_record[key] = value["value"]
+            if not insight_record.get(cursor_key):
+                insight_record[cursor_key] = value["end_time"]
 
         yield insight_record
 
@@ -220,7 +393,7 @@ class UserInsights(InstagramIncrementalStream):
             account_id = account["instagram_business_account"]["id"]
 
             state_value = stream_state.get(account_id, {}).get(self.cursor_field)
-            start_date = pendulum.parse(state_value) if state_value else self._start_date
+            start_date = parse_datetime(state_value) if state_value else self._start_date
             start_date = max(start_date, self._start_date, pendulum.now().subtract(days=self.buffer_days))
             for since in pendulum.period(start_date, self._end_date).range("days", self.days_increment):
                 until = since.add(days=self.days_increment)
@@ -261,58 +434,57 @@ class UserInsights(InstagramIncrementalStream):
 
     def get_updated_state(self, current_stream_state: MutableMapping[str, Any], latest_record: Mapping[str, Any]):
         """Update stream state from latest record"""
-        record_value = latest_record[self.cursor_field]
+        cursor_field = self.cursor_field
+        record_cursor = parse_datetime(latest_record[cursor_field])
         account_id = latest_record.get("business_account_id")
-        state_value = current_stream_state.get(account_id, {}).get(self.cursor_field) or record_value
-        max_cursor = max(pendulum.parse(state_value), pendulum.parse(record_value))
+        state_value = current_stream_state.get(account_id, {}).get(cursor_field)
+        if state_value and parse_datetime(state_value) >= record_cursor:
+            return current_stream_state
 
-        new_stream_state = copy.deepcopy(current_stream_state)
-        new_stream_state[account_id] = {
-            self.cursor_field: str(max_cursor),
-        }
+        # states of other accounts are not modified, so they can be shared with the current state
+        return {**current_stream_state, account_id: {cursor_field: str(record_cursor)}}
 
-        return new_stream_state
 
-
-class Media(InstagramStream):
+class Media(InstagramReadAheadStream):
     """Children objects can only be of the media_type == "CAROUSEL_ALBUM".
     And children object does not support INVALID_CHILDREN_FIELDS fields,
     so they are excluded when trying to get child objects to avoid the error
     """
 
-    INVALID_CHILDREN_FIELDS = ["caption", "comments_count", "is_comment_enabled", "like_count", "children"]
+    INVALID_CHILDREN_FIELDS = frozenset(["caption", "comments_count", "is_comment_enabled", "like_count", "children"])
 
-    def read_records(
-        self,
-        sync_mode: SyncMode,
-        cursor_field: List[str] = None,
-        stream_slice: Mapping[str, Any] = None,
-        stream_state: Mapping[str, Any] = None,
-    ) -> Iterable[Mapping[str, Any]]:
-        """
-        This method should be overridden by subclasses to read records based on the inputs
+    @cached_property
+    def children_fields(self) -> List[str]:
+        """List of fields that we want to query for children objects"""
+        return [field for field in self.fields if field not in self.INVALID_CHILDREN_FIELDS]
+
+    @cached_property
+    def _children_fields_param(self) -> str:
+        """children_fields in the form of request parameter. Passing fields to api_get instead would make SDK
+        validate and join all of them for each child, with a linear search over IGMedia fields for every one.
         """
-        account = stream_slice["account"]
+        return ",".join(self.children_fields)
+
+    def _read_records(self, account: Mapping[str, Any]) -> Iterator[MutableMapping[str, Any]]:
         ig_account = account["instagram_business_account"]
-        media = ig_account.get_media(params=self.request_params(), fields=self.fields)
-        for record in media:
-            record_data = record.export_all_data()
-            if record_data.get("children"):
-                ids = [child["id"] for child in record["children"]["data"]]
-                record_data["children"] = list(self._get_children(ids))
-
-            record_data.update(
-                {
-                    "page_id": account["page_id"],
-                    "business_account_id": ig_account.get("id"),
-                }
-            )
-            yield self.transform(record_data)
+        account_fields = self._account_fields(account)
+        media = self.get_media_edge(ig_account, "media", fields=self.fields)
+        # records are handled page by page, so children of all albums on a page are requested together
+        for page in iter(lambda: list(islice(media, self.page_size)), []):
+            records = [record.export_all_data() for record in page]
+            albums = [record_data for record_data in records if record_data.get("children")]
+            children = self._get_children([child["id"] for record_data in albums for child in record_data["children"]["data"]])
+            for record_data in albums:
+                record_data["children"] = list(islice(children, len(record_data["children"]["data"])))
+
+            for record_data in records:
+                record_data.update(account_fields)
+                yield self.transform(record_data)
 
     def _get_children(self, ids: List):
-        children_fields = list(set(self.fields) - set(self.INVALID_CHILDREN_FIELDS))
-        for pk in ids:
-            yield self.transform(IGMedia(pk).api_get(fields=children_fields).export_all_data())
+        pending_requests = [IGMedia(pk).api_get(params={"fields": self._children_fields_param}, pending=True) for pk in ids]
+        for child in self.execute_in_batch(pending_requests):
+            yield self.transform(child)
 
 
 class MediaInsights(Media):
@@ -321,68 +493,53 @@ class MediaInsights(Media):
     MEDIA_METRICS = ["engagement", "impressions", "reach", "saved"]
     CAROUSEL_ALBUM_METRICS = ["carousel_album_engagement", "carousel_album_impressions", "carousel_album_reach", "carousel_album_saved"]
 
-    def read_records(
-        self,
-        sync_mode: SyncMode,
-        cursor_field: List[str] = None,
-        stream_slice: Mapping[str, Any] = None,
-        stream_state: Mapping[str, Any] = None,
-    ) -> Iterable[Mapping[str, Any]]:
-        account = stream_slice["account"]
+    def _read_records(self, account: Mapping[str, Any]) -> Iterator[MutableMapping[str, Any]]:
         ig_account = account["instagram_business_account"]
-        media = ig_account.get_media(params=self.request_params(), fields=["media_type"])
-        for ig_media in media:
-            account_id = ig_account.get("id")
-            insights = self._get_insights(ig_media, account_id)
-            if insights is None:
-                break
-
-            insights["id"] = ig_media["id"]
-            insights["page_id"] = account["page_id"]
-            insights["business_account_id"] = ig_account["id"]
-            yield self.transform(insights)
-
-    def _get_insights(self, item, account_id) -> Optional[MutableMapping[str, Any]]:
-        """Get insights for specific media"""
+        account_fields = self._account_fields(account)
+        account_id = account_fields["business_account_id"]
+        media = self.get_media_edge(ig_account, "media", fields=["media_type"])
+        for page in iter(lambda: list(islice(media, self.page_size)), []):
+            pending_requests = [ig_media.get_insights(params={"metric": self._get_metrics(ig_media)}, pending=True) for ig_media in page]
+            responses = self.execute_in_batch(pending_requests, keep_error=self._is_media_creation_time_error)
+            for ig_media, response in zip(page, responses):
+                if isinstance(response, FacebookRequestError):
+                    # An error might occur if the media was posted before the most recent time that
+                    # the user's account was converted to a business account from a personal account
+                    details = response.body().get("error", {}).get("error_user_title") or response.api_error_message()
+                    log(self.logger, logging.ERROR, f"Insights error for business_account_id {account_id}: {details}")
+                    # We receive all Media starting from the last one, and if on the next Media we get an Insight error,
+                    # then no reason to make inquiries for each Media further, since they were published even earlier.
+                    responses.close()
+                    return
+
+                insights = {record["name"]: record["values"][0]["value"] for record in response.get("data", [])}
+                insights["id"] = ig_media["id"]
+                insights.update(account_fields)
+                yield self.transform(insights)
+
+    def _get_metrics(self, item: IGMedia) -> List[str]:
+        """Metrics available for specific media"""
         if item.get("media_type") == "VIDEO":
-            metrics = self.MEDIA_METRICS + ["video_views"]
+            return self.MEDIA_METRICS + ["video_views"]
         elif item.get("media_type") == "CAROUSEL_ALBUM":
-            metrics = self.CAROUSEL_ALBUM_METRICS
-        else:
-            metrics = self.MEDIA_METRICS
-
-        try:
-            insights = item.get_insights(params={"metric": metrics})
-            return {record.get("name"): record.get("values")[0]["value"] for record in insights}
-        except FacebookRequestError as error:
-            # An error might occur if the media was posted before the most recent time that
-            # the user's account was converted to a business account from a personal account
-            if error.api_error_subcode() == 2108006:
-                details = error.body().get("error", {}).get("error_user_title") or error.api_error_message()
-                self.logger.error(f"Insights error for business_account_id {account_id}: {details}")
-                # We receive all Media starting from the last one, and if on the next Media we get an Insight error,
-                # then no reason to make inquiries for each Media further, since they were published even earlier.
-                return None
-            raise error
-
-
-class Stories(InstagramStream):
+            return self.CAROUSEL_ALBUM_METRICS
+        return self.MEDIA_METRICS
+
+    @staticmethod
+    def _is_media_creation_time_error(error: FacebookRequestError) -> bool:
+        return bool(error.api_error_subcode() == 2108006)
+
+
+class Stories(InstagramReadAheadStream):
     """Docs: https://developers.facebook.com/docs/instagram-api/reference/ig-user/stories"""
 
-    def read_records(
-        self,
-        sync_mode: SyncMode,
-        cursor_field: List[str] = None,
-        stream_slice: Mapping[str, Any] = None,
-        stream_state: Mapping[str, Any] = None,
-    ) -> Iterable[Mapping[str, Any]]:
-        account = stream_slice["account"]
+    def _read_records(self, account: Mapping[str, Any]) -> Iterator[MutableMapping[str, Any]]:
         ig_account = account["instagram_business_account"]
-        stories = ig_account.get_stories(params=self.request_params(), fields=self.fields)
+        account_fields = self._account_fields(account)
+        stories = self.get_media_edge(ig_account, "stories", fields=self.fields)
         for record in stories:
             record_data = record.export_all_data()
-            record_data["page_id"] = account["page_id"]
-            record_data["business_account_id"] = ig_account.get("id")
+            record_data.update(account_fields)
             yield self.transform(record_data)
 
 
@@ -391,36 +548,28 @@ class StoryInsights(Stories):
 
     metrics = ["exits", "impressions", "reach", "replies", "taps_forward", "taps_back"]
 
-    def read_records(
-        self,
-        sync_mode: SyncMode,
-        cursor_field: List[str] = None,
-        stream_slice: Mapping[str, Any] = None,
-        stream_state: Mapping[str, Any] = None,
-    ) -> Iterable[Mapping[str, Any]]:
-        account = stream_slice["account"]
+    def _read_records(self, account: Mapping[str, Any]) -> Iterator[MutableMapping[str, Any]]:
         ig_account = account["instagram_business_account"]
-        stories = ig_account.get_stories(params=self.request_params(), fields=[])
-        for ig_story in stories:
-            insights = self._get_insights(IGMedia(ig_story["id"]))
-            if not insights:
-                continue
-
-            insights["id"] = ig_story["id"]
-            insights["page_id"] = account["page_id"]
-            insights["business_account_id"] = ig_account["id"]
-            yield self.transform(insights)
-
-    def _get_insights(self, story: IGMedia) -> MutableMapping[str, Any]:
-        """Get insights for specific story"""
-
-        # Story IG Media object metrics with values less than 5 will return an error code 10 with the message (#10)
-        # Not enough viewers for the media to show insights.
-        try:
-            insights = story.get_insights(params={"metric": self.metrics})
-            return {record["name"]: record["values"][0]["value"] for record in insights}
-        except FacebookRequestError as error:
-            if error.api_error_code() == 10:
-                self.logger.error(f"Insights error: {error.api_error_message()}")
-                return {}
-            raise error
+        account_fields = self._account_fields(account)
+        stories = self.get_media_edge(ig_account, "stories", fields=[])
+        for page in iter(lambda: list(islice(stories, self.page_size)), []):
+            pending_requests = [ig_story.get_insights(params={"metric": self.metrics}, pending=True) for ig_story in page]
+            responses = self.execute_in_batch(pending_requests, keep_error=self._is_not_enough_viewers_error)
+            for ig_story, response in zip(page, responses):
+                # Story IG Media object metrics with values less than 5 will return an error code 10 with the message (#10)
+                # Not enough viewers for the media to show insights.
+                if isinstance(response, FacebookRequestError):
+                    log(self.logger, logging.ERROR, f"Insights error: {response.api_error_message()}")
+                    continue
+
+                insights = {record["name"]: record["values"][0]["value"] for record in response.get("data", [])}
+                if not insights:
+                    continue
+
+                insights["id"] = ig_story["id"]
+                insights.update(account_fields)
+                yield self.transform(insights)
+
+    @staticmethod
+    def _is_not_enough_viewers_error(error: FacebookRequestError) -> bool:
+        return bool(error.api_error_code() == 10)
@@ -30,20 +30,14 @@ def some_config_fixture(account_id):
 
 
 @fixture(name="fb_account_response")
-def fb_account_response_fixture(account_id, some_config, requests_mock):
-    account = {"id": "test_id", "instagram_business_account": {"id": "test_id"}}
-    requests_mock.register_uri(
-        "GET",
-        FacebookSession.GRAPH + f"/{FB_API_VERSION}/act_{account_id}/"
-        f"?access_token={some_config['access_token']}&fields=instagram_business_account",
-        json=account,
-    )
+def fb_account_response_fixture(account_id):
     return {
         "json": {
             "data": [
                 {
                     "account_id": account_id,
                     "id": f"act_{account_id}",
+                    "instagram_business_account": {"id": "test_id"},
                 }
             ],
             "paging": {"cursors": {"before": "MjM4NDYzMDYyMTcyNTAwNzEZD", "after": "MjM4NDYzMDYyMTcyNTAwNzEZD"}},
@@ -58,7 +52,8 @@ def api_fixture(some_config, requests_mock, fb_account_response):
 
     requests_mock.register_uri(
         "GET",
-        FacebookSession.GRAPH + f"/{FB_API_VERSION}/me/accounts?" f"access_token={some_config['access_token']}&summary=true",
+        FacebookSession.GRAPH + f"/{FB_API_VERSION}/me/accounts?"
+        f"access_token={some_config['access_token']}&summary=true&fields=instagram_business_account",
         [fb_account_response],
     )
 
@@ -0,0 +1,145 @@
+#
+# Copyright (c) 2022 Airbyte, Inc., all rights reserved.
+#
+
+import logging
+import threading
+import time
+
+import pytest
+from facebook_business import FacebookSession
+from facebook_business.exceptions import FacebookRequestError
+from source_instagram.api import InstagramAPI as API
+from source_instagram.api import MyFacebookAdsApi, backoff_policy
+from source_instagram.common import InstagramAPIException, log
+
+
+def test_map_concurrently_keeps_order(api):
+    def slow_double(value):
+        time.sleep(0.01 * (5 - value))
+        return value * 2
+
+    assert list(api.map_concurrently(slow_double, range(5))) == [0, 2, 4, 6, 8]
+
+
+def test_map_concurrently_consumes_items_lazily(api):
+    consumed = []
+
+    def items():
+        for value in range(100):
+            consumed.append(value)
+            yield value
+
+    results = api.map_concurrently(lambda value: value, items())
+    assert next(results) == 0
+    assert len(consumed) == api.max_workers
+
+
+def test_map_concurrently_logs_on_consumer_thread(api, mocker):
+    logger = mocker.Mock()
+    logged_from = []
+    logger.log.side_effect = lambda level, message: logged_from.append((threading.current_thread(), message))
+
+    def log_value(value):
+        log(logger, logging.INFO, f"value {value}")
+        return value
+
+    assert list(api.map_concurrently(log_value, range(20))) == list(range(20))
+    assert logged_from == [(threading.current_thread(), f"value {value}") for value in range(20)]
+
+
+def test_submit_logs_before_raising_error(api, mocker):
+    logger = mocker.Mock()
+
+    def fail():
+        log(logger, logging.WARNING, "about to fail")
+        raise ValueError("failed")
+
+    task = api.submit(fail)
+    with pytest.raises(ValueError, match="failed"):
+        task.result()
+    logger.log.assert_called_once_with(logging.WARNING, "about to fail")
+
+
+def test_map_concurrently_logs_retries_on_consumer_thread(api, mocker, caplog):
+    mocker.patch("time.sleep")
+    caplog.set_level(logging.DEBUG)
+    attempts = []
+
+    @backoff_policy
+    def fail_once(value):
+        attempts.append(value)
+        if attempts.count(value) == 1:
+            raise FacebookRequestError("failed", request_context={}, http_status=429, http_headers={}, body={})
+        return value
+
+    assert list(api.map_concurrently(fail_once, range(3))) == [0, 1, 2]
+    assert caplog.records
+    assert {record.threadName for record in caplog.records} == {threading.current_thread().name}
+
+
+def test_connection_pool_fits_workers(some_config):
+    api = API(access_token=some_config["access_token"], max_workers=32)
+    adapter = api.api._session.requests.get_adapter(FacebookSession.GRAPH)
+
+    assert adapter._pool_maxsize == 34
+
+
+def test_call_rate_limit_pauses_all_calls(api, mocker):
+    sleep = mocker.patch.object(api.api._stopped, "wait", return_value=False)
+    # two throttled responses at 100 and 110 seconds, the pause then ends at 170
+    mocker.patch("source_instagram.api.monotonic", side_effect=[100.0, 110.0, 120.0, 170.0])
+    response = mocker.Mock(headers=mocker.Mock(return_value={"x-app-usage": '{"call_count": 95, "estimated_time_to_regain_access": 1}'}))
+
+    api.api.handle_call_rate_limit(response, params={})
+    api.api.handle_call_rate_limit(response, params={})
+    api.api.wait_for_resume()
+
+    sleep.assert_called_once_with(50.0)
+
+
+def test_no_pause_without_estimated_time_to_regain_access(api, mocker):
+    sleep = mocker.patch.object(api.api._stopped, "wait", return_value=False)
+    response = mocker.Mock(headers=mocker.Mock(return_value={"x-app-usage": '{"call_count": 95}'}))
+
+    api.api.handle_call_rate_limit(response, params={})
+    api.api.wait_for_resume()
+
+    sleep.assert_not_called()
+
+
+def test_close_stops_pause_and_calls(api, mocker):
+    response = mocker.Mock(headers=mocker.Mock(return_value={"x-app-usage": '{"estimated_time_to_regain_access": 60}'}))
+    api.api.handle_call_rate_limit(response, params={})
+    paused = api.submit(api.api.call, "GET", ("me",))
+    while not paused._future.running():
+        time.sleep(0.01)
+
+    started_at = time.monotonic()
+    api.close()
+    with pytest.raises(InstagramAPIException, match="stopped"):
+        paused.result()
+    assert time.monotonic() - started_at < 5
+
+
+def test_no_pause_below_call_rate_threshold(api, mocker):
+    sleep = mocker.patch.object(api.api._stopped, "wait", return_value=False)
+    response = mocker.Mock(headers=mocker.Mock(return_value={"x-app-usage": '{"call_count": 50}'}))
+
+    api.api.handle_call_rate_limit(response, params={})
+    api.api.wait_for_resume()
+
+    sleep.assert_not_called()
+
+
+@pytest.mark.parametrize(
+    "headers,expected",
+    [
+        ({"x-app-usage": '{"call_count": 20, "estimated_time_to_regain_access": 2}'}, (20, 120.0)),
+        ({"x-ad-account-usage": '{"acc_id_util_pct": 95}'}, (95, 0.0)),
+        ({"x-app-usage": "{}"}, (0, 0.0)),
+        ({}, (0, 0.0)),
+    ],
+)
+def test_parse_call_rate_header(headers, expected):
+    assert MyFacebookAdsApi.parse_call_rate_header(headers) == expected
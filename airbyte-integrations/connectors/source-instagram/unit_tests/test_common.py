@@ -2,7 +2,13 @@
 # Copyright (c) 2022 Airbyte, Inc., all rights reserved.
 #
 
-from source_instagram.common import remove_params_from_url
+import logging
+import threading
+import time
+
+import pendulum
+import pytest
+from source_instagram.common import buffered, log, parse_datetime, remove_params_from_url
 
 
 def test_empty_url():
@@ -51,3 +57,72 @@ def test_removes_params():
     url = "https://google.com?test=123&test2=456"
     parsed_url = remove_params_from_url(url=url, params=["test2"])
     assert parsed_url == "https://google.com?test=123"
+
+
+def test_removes_only_exact_params():
+    url = "https://google.com?_nc_rid=123&x_nc_rid=456&_nc_rid_x=789"
+    parsed_url = remove_params_from_url(url=url, params=["_nc_rid"])
+    assert parsed_url == "https://google.com?x_nc_rid=456&_nc_rid_x=789"
+
+
+def test_keeps_fragment():
+    url = "https://google.com/video.mp4?ccb=1-5&_nc_sid=08e&oe=62#t=10"
+    parsed_url = remove_params_from_url(url=url, params=["ccb"])
+    assert parsed_url == "https://google.com/video.mp4?_nc_sid=08e&oe=62#t=10"
+
+
+def test_buffered_keeps_order():
+    assert list(buffered(range(1000), maxsize=10)) == list(range(1000))
+
+
+def test_buffered_raises_producer_error():
+    def items():
+        yield 1
+        raise ValueError("failed to read")
+
+    records = buffered(items())
+    assert next(records) == 1
+    with pytest.raises(ValueError, match="failed to read"):
+        next(records)
+
+
+def test_buffered_stops_producer_when_consumer_stops():
+    closed = []
+
+    def items():
+        try:
+            yield from range(1000)
+        finally:
+            closed.append(True)
+
+    records = buffered(items(), maxsize=1)
+    assert next(records) == 0
+    records.close()
+
+    for _ in range(50):
+        if closed:
+            break
+        time.sleep(0.1)
+    assert closed
+
+
+def test_buffered_logs_producer_messages_on_consumer_thread(mocker):
+    logger = mocker.Mock()
+    logged = []
+    logger.log.side_effect = lambda level, message: logged.append((threading.current_thread(), message))
+
+    def items():
+        for value in range(100):
+            log(logger, logging.INFO, f"read {value}")
+            yield value
+
+    consumer = threading.current_thread()
+    for value in buffered(items(), maxsize=10):
+        # messages are logged in line with items, so the message of each item comes before it
+        assert logged[-1] == (consumer, f"read {value}")
+    assert len(logged) == 100
+
+
+def test_parse_datetime():
+    assert parse_datetime("2020-05-04T07:00:00+0000") == pendulum.datetime(2020, 5, 4, 7)
+    assert parse_datetime("2020-05-04T07:00:00+0000") is parse_datetime("2020-05-04T07:00:00+0000")
@@ -3,6 +3,7 @@
 #
 
 
+import pytest
 from airbyte_cdk.logger import AirbyteLogger
 from airbyte_cdk.models import (
     AirbyteStream,
@@ -54,6 +55,13 @@ def test_streams(api, config):
     assert len(streams) == 7
 
 
+def test_streams_use_page_size_and_max_workers_of_config(api, config):
+    streams = SourceInstagram().streams({**config, "page_size": 25, "max_workers": 4})
+
+    assert {stream.page_size for stream in streams} == {25}
+    assert {stream._api.max_workers for stream in streams} == {4}
+
+
 def test_spec():
     spec = SourceInstagram().spec()
 
@@ -72,3 +80,22 @@ def test_read(config):
         ]
     )
     assert source.read(logger, config, catalog)
+
+
+def test_read_closes_api(api, config, mocker):
+    close = mocker.patch("source_instagram.source.InstagramAPI.close")
+    source = SourceInstagram()
+    catalog = ConfiguredAirbyteCatalog(
+        streams=[
+            ConfiguredAirbyteStream(
+                stream=AirbyteStream(name="unknown", json_schema={}),
+                sync_mode=SyncMode.full_refresh,
+                destination_sync_mode=DestinationSyncMode.overwrite,
+            )
+        ]
+    )
+
+    with pytest.raises(KeyError):
+        list(source.read(logger, config, catalog))
+    assert close.called
+    assert not source._apis
@@ -2,11 +2,14 @@
 # Copyright (c) 2022 Airbyte, Inc., all rights reserved.
 #
 
+import json
 from datetime import datetime
 from unittest.mock import MagicMock
 
 import pytest
+from airbyte_cdk.sources.utils.schema_helpers import ResourceSchemaLoader
 from facebook_business import FacebookAdsApi, FacebookSession
+from facebook_business.adobjects.iguser import IGUser
 from source_instagram.streams import (
     InstagramStream,
     Media,
@@ -30,6 +33,24 @@ def test_clear_url(config):
     assert InstagramStream._clear_url({"media_url": media_url, "profile_picture_url": profile_picture_url}) == expected
 
 
+def test_clear_url_keeps_records_without_params():
+    record = {"id": "test_id", "media_url": "https://google.com/photo.jpg?_nc_cat=1", "media_type": "IMAGE"}
+
+    assert InstagramStream._clear_url(dict(record)) == record
+
+
+def test_json_schema_loaded_once_per_stream_class(api, mocker):
+    mocker.patch.dict(InstagramStream._json_schemas, clear=True)
+    get_schema = mocker.spy(ResourceSchemaLoader, "get_schema")
+
+    schema = Stories(api=api).get_json_schema()
+    schema["properties"].clear()
+
+    assert Stories(api=api).fields
+    assert Stories(api=api).get_json_schema()["properties"]
+    assert get_schema.call_count == 1
+
+
 def test_state_outdated(api, config):
     assert UserInsights(api=api, start_date=datetime.strptime(config["start_date"], "%Y-%m-%dT%H:%M:%S"))._state_has_legacy_format(
         {"state": MagicMock()}
@@ -42,15 +63,68 @@ def test_state_is_not_outdated(api, config):
     )
 
 
+def test_user_insights_get_updated_state(api, config):
+    stream = UserInsights(api=api, start_date=datetime.strptime(config["start_date"], "%Y-%m-%dT%H:%M:%S"))
+    state = {"other_id": {"date": "2020-05-01T07:00:00+00:00"}}
+
+    state = stream.get_updated_state(state, {"business_account_id": "test_id", "date": "2020-05-04T07:00:00+0000"})
+    assert state == {"other_id": {"date": "2020-05-01T07:00:00+00:00"}, "test_id": {"date": "2020-05-04T07:00:00+00:00"}}
+
+    older_record = {"business_account_id": "test_id", "date": "2020-05-03T07:00:00+0000"}
+    assert stream.get_updated_state(state, older_record) == state
+
+
 def test_media_get_children(api, requests_mock, some_config):
     test_id = "test_id"
     expected = {"id": "test_id"}
 
-    requests_mock.register_uri("GET", FacebookSession.GRAPH + f"/{FB_API_VERSION}/{test_id}/", [{}])
+    requests_mock.register_uri(
+        "POST", FacebookSession.GRAPH + f"/{FB_API_VERSION}/", [{"json": [{"code": 200, "body": json.dumps(expected)}]}]
+    )
 
     assert next(Media(api=api)._get_children([test_id])) == expected
 
 
+def test_batch_requests_without_response_retried_with_backoff(api, requests_mock, mocker):
+    sleep = mocker.patch("time.sleep")
+    expected = {"id": "test_id"}
+    no_response = {"json": [None]}
+
+    batch_mock = requests_mock.register_uri(
+        "POST",
+        FacebookSession.GRAPH + f"/{FB_API_VERSION}/",
+        [no_response, no_response, {"json": [{"code": 200, "body": json.dumps(expected)}]}],
+    )
+
+    assert next(Media(api=api)._get_children(["test_id"])) == expected
+    assert batch_mock.call_count == 3
+    sleep.assert_called_once()
+
+
+def test_media_read_album_children(api, requests_mock):
+    test_id = "test_id"
+    stream = Media(api=api)
+    album = {"id": "album_id", "children": {"data": [{"id": "child_1"}, {"id": "child_2"}]}}
+    children_responses = [{"code": 200, "body": json.dumps({"id": child["id"]})} for child in album["children"]["data"]]
+
+    requests_mock.register_uri(
+        "GET", FacebookSession.GRAPH + f"/{FB_API_VERSION}/{test_id}/media", [{"json": {"data": [album, {"id": "photo_id"}]}}]
+    )
+    batch_mock = requests_mock.register_uri("POST", FacebookSession.GRAPH + f"/{FB_API_VERSION}/", [{"json": children_responses}])
+
+    records = read_full_refresh(stream)
+    assert batch_mock.call_count == 1
+    assert records == [
+        {
+            "business_account_id": "test_id",
+            "children": [{"id": "child_1"}, {"id": "child_2"}],
+            "id": "album_id",
+            "page_id": "act_unknown_account",
+        },
+        {"business_account_id": "test_id", "id": "photo_id", "page_id": "act_unknown_account"},
+    ]
+
+
 def test_media_read(api, user_stories_data, requests_mock):
     test_id = "test_id"
     stream = Media(api=api)
@@ -66,17 +140,51 @@ def test_media_insights_read(api, user_stories_data, user_media_insights_data, r
     stream = MediaInsights(api=api)
 
     requests_mock.register_uri("GET", FacebookSession.GRAPH + f"/{FB_API_VERSION}/{test_id}/media", [{"json": user_stories_data}])
-    requests_mock.register_uri("GET", FacebookSession.GRAPH + f"/{FB_API_VERSION}/{test_id}/insights", [{"json": user_media_insights_data}])
+    insights_response = {"code": 200, "body": json.dumps({"data": [user_media_insights_data]})}
+    requests_mock.register_uri("POST", FacebookSession.GRAPH + f"/{FB_API_VERSION}/", [{"json": [insights_response]}])
 
     records = read_full_refresh(stream)
     assert records == [{"business_account_id": "test_id", "id": "test_id", "impressions": 264, "page_id": "act_unknown_account"}]
 
 
+@pytest.mark.parametrize(
+    "retry_succeeds,expected_ids",
+    [(False, ["media_1"]), (True, ["media_1", "media_2", "media_3"])],
+    ids=["error_again", "retry_succeeds"],
+)
+def test_media_insights_read_stops_on_media_creation_time_error(
+    api, user_media_insights_data, requests_mock, mocker, retry_succeeds, expected_ids
+):
+    test_id = "test_id"
+    stream = MediaInsights(api=api)
+    sleep = mocker.patch("source_instagram.streams.sleep")
+    media = {"data": [{"id": "media_1"}, {"id": "media_2"}, {"id": "media_3"}]}
+    error = {"error": {"type": "OAuthException", "code": 100, "error_subcode": 2108006, "message": "Invalid parameter"}}
+
+    requests_mock.register_uri("GET", FacebookSession.GRAPH + f"/{FB_API_VERSION}/{test_id}/media", [{"json": media}])
+    insights_response = {"code": 200, "body": json.dumps({"data": [user_media_insights_data]})}
+    error_response = {"code": 400, "body": json.dumps(error)}
+    batch_mock = requests_mock.register_uri(
+        "POST",
+        FacebookSession.GRAPH + f"/{FB_API_VERSION}/",
+        [
+            {"json": [insights_response, error_response, insights_response]},
+            # only the failed request is retried
+            {"json": [insights_response if retry_succeeds else error_response]},
+        ],
+    )
+
+    records = read_full_refresh(stream)
+    assert [record["id"] for record in records] == expected_ids
+    assert batch_mock.call_count == 2
+    sleep.assert_called_once_with(stream.kept_error_retry_interval)
+
+
 def test_user_read(api, user_data, requests_mock):
     test_id = "test_id"
     stream = Users(api=api)
 
-    requests_mock.register_uri("GET", FacebookSession.GRAPH + f"/{FB_API_VERSION}/{test_id}/", [{"json": user_data}])
+    requests_mock.register_uri("GET", FacebookSession.GRAPH + f"/{FB_API_VERSION}/?ids={test_id}", [{"json": {test_id: user_data}}])
 
     records = read_full_refresh(stream)
     assert records == [
@@ -90,15 +198,45 @@ def test_user_read(api, user_data, requests_mock):
     ]
 
 
-def test_user_insights_read(api, config, user_insight_data, requests_mock):
-    test_id = "test_id"
+def test_user_read_all_accounts_in_one_request(api, requests_mock):
+    api.accounts = [
+        {"page_id": "page_1", "instagram_business_account": IGUser("user_1")},
+        {"page_id": "page_2", "instagram_business_account": IGUser("user_2")},
+    ]
+    stream = Users(api=api)
+
+    users_mock = requests_mock.register_uri(
+        "GET",
+        FacebookSession.GRAPH + f"/{FB_API_VERSION}/?ids=user_1,user_2",
+        [{"json": {"user_1": {"id": "user_1"}, "user_2": {"id": "user_2"}}}],
+    )
+
+    records = read_full_refresh(stream)
+    assert records == [{"id": "user_1", "page_id": "page_1"}, {"id": "user_2", "page_id": "page_2"}]
+    assert users_mock.call_count == 1
+
 
+def test_user_insights_read(api, config, user_insight_data, requests_mock):
     stream = UserInsights(api=api, start_date=datetime.strptime(config["start_date"], "%Y-%m-%dT%H:%M:%S"))
 
-    requests_mock.register_uri("GET", FacebookSession.GRAPH + f"/{FB_API_VERSION}/{test_id}/insights", [{"json": user_insight_data}])
+    period_responses = [{"code": 200, "body": json.dumps({"data": [user_insight_data]})}] * len(UserInsights.METRICS_BY_PERIOD)
+    requests_mock.register_uri("POST", FacebookSession.GRAPH + f"/{FB_API_VERSION}/", [{"json": period_responses}])
 
     records = read_incremental(stream, {})
     assert records
+    assert records[0]["impressions"] == 4
+
+
+def test_user_insights_read_keys_of_periods(api, config, user_insight_data, requests_mock):
+    stream = UserInsights(api=api, start_date=datetime.strptime(config["start_date"], "%Y-%m-%dT%H:%M:%S"))
+
+    period_responses = [
+        {"code": 200, "body": json.dumps({"data": [{**user_insight_data, "period": period}]})} for period in UserInsights.METRICS_BY_PERIOD
+    ]
+    requests_mock.register_uri("POST", FacebookSession.GRAPH + f"/{FB_API_VERSION}/", [{"json": period_responses}])
+
+    records = read_incremental(stream, {})
+    assert {"impressions", "impressions_week", "impressions_days_28"} <= set(records[0])
 
 
 def test_user_lifetime_insights_read(api, config, user_insight_data, requests_mock):
@@ -128,6 +266,46 @@ def test_stories_read(api, requests_mock, user_stories_data):
 
     records = read_full_refresh(stream)
     assert records == [{"business_account_id": "test_id", "id": "test_id", "page_id": "act_unknown_account"}]
+    assert "summary" not in requests_mock.last_request.qs
+
+
+def test_stories_read_with_page_size(api, requests_mock, user_stories_data):
+    test_id = "test_id"
+    stream = Stories(api=api, page_size=500)
+
+    requests_mock.register_uri("GET", FacebookSession.GRAPH + f"/{FB_API_VERSION}/{test_id}/stories", [{"json": user_stories_data}])
+
+    read_full_refresh(stream)
+    assert requests_mock.last_request.qs["limit"] == ["500"]
+
+
+def test_stories_read_next_page(api, requests_mock):
+    test_id = "test_id"
+    stream = Stories(api=api)
+    next_page_url = FacebookSession.GRAPH + f"/{FB_API_VERSION}/{test_id}/stories?after=cursor"
+
+    requests_mock.register_uri(
+        "GET",
+        FacebookSession.GRAPH + f"/{FB_API_VERSION}/{test_id}/stories",
+        [{"json": {"data": [{"id": "story_1"}], "paging": {"next": next_page_url}}}, {"json": {"data": [{"id": "story_2"}]}}],
+    )
+
+    records = read_full_refresh(stream)
+    assert [record["id"] for record in records] == ["story_1", "story_2"]
+
+
+@pytest.mark.parametrize("buffer_size,is_buffered", [(0, False), (200, True)])
+def test_stories_read_ahead_depends_on_buffer_size(api, requests_mock, user_stories_data, mocker, buffer_size, is_buffered):
+    test_id = "test_id"
+    stream = Stories(api=api)
+    stream.buffer_size = buffer_size
+    buffered = mocker.patch("source_instagram.streams.buffered", side_effect=lambda records, maxsize: records)
+
+    requests_mock.register_uri("GET", FacebookSession.GRAPH + f"/{FB_API_VERSION}/{test_id}/stories", [{"json": user_stories_data}])
+
+    records = read_full_refresh(stream)
+    assert [record["id"] for record in records] == ["test_id"]
+    assert buffered.called == is_buffered
 
 
 def test_stories_insights_read(api, requests_mock, user_stories_data, user_media_insights_data):
@@ -135,12 +313,33 @@ def test_stories_insights_read(api, requests_mock, user_stories_data, user_media
     stream = StoryInsights(api=api)
 
     requests_mock.register_uri("GET", FacebookSession.GRAPH + f"/{FB_API_VERSION}/{test_id}/stories", [{"json": user_stories_data}])
-    requests_mock.register_uri("GET", FacebookSession.GRAPH + f"/{FB_API_VERSION}/{test_id}/insights", [{"json": user_media_insights_data}])
+    insights_response = {"code": 200, "body": json.dumps({"data": [user_media_insights_data]})}
+    requests_mock.register_uri("POST", FacebookSession.GRAPH + f"/{FB_API_VERSION}/", [{"json": [insights_response]}])
 
     records = read_full_refresh(stream)
     assert records == [{"business_account_id": "test_id", "id": "test_id", "impressions": 264, "page_id": "act_unknown_account"}]
 
 
+def test_stories_insights_read_skips_stories_without_enough_viewers(api, requests_mock, user_media_insights_data, mocker):
+    test_id = "test_id"
+    stream = StoryInsights(api=api)
+    sleep = mocker.patch("source_instagram.streams.sleep")
+    stories = {"data": [{"id": "story_1"}, {"id": "story_2"}]}
+    error = {"error": {"type": "OAuthException", "message": "(#10) Not enough viewers for the media to show insights", "code": 10}}
+
+    requests_mock.register_uri("GET", FacebookSession.GRAPH + f"/{FB_API_VERSION}/{test_id}/stories", [{"json": stories}])
+    insights_response = {"code": 200, "body": json.dumps({"data": [user_media_insights_data]})}
+    error_response = {"code": 400, "body": json.dumps(error)}
+    batch_mock = requests_mock.register_uri(
+        "POST", FacebookSession.GRAPH + f"/{FB_API_VERSION}/", [{"json": [error_response, insights_response]}, {"json": [error_response]}]
+    )
+
+    records = read_full_refresh(stream)
+    assert [record["id"] for record in records] == ["story_2"]
+    assert batch_mock.call_count == 2
+    sleep.assert_called_once_with(stream.kept_error_retry_interval)
+
+
 @pytest.mark.parametrize(
     "error_response",
     [
@@ -7,6 +7,7 @@ from setuptools import find_packages, setup
 
 MAIN_REQUIREMENTS = [
     "airbyte-cdk",
+    "orjson>=3.6,<4",
 ]
 
 TEST_REQUIREMENTS = [
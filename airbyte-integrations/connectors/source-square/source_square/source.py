@@ -2,7 +2,6 @@
 # Copyright (c) 2022 Airbyte, Inc., all rights reserved.
 #
 
-import json
 from abc import ABC, abstractmethod
 from typing import Any, Iterable, List, Mapping, MutableMapping, Optional, Tuple, Union
 
@@ -16,7 +15,12 @@ from airbyte_cdk.sources.streams.http import HttpStream
 from airbyte_cdk.sources.streams.http.auth.core import HttpAuthenticator
 from airbyte_cdk.sources.streams.http.requests_native_auth import Oauth2Authenticator, TokenAuthenticator
 from requests.auth import AuthBase
-from source_square.utils import separate_items_by_count
+from source_square.utils import parse_datetime, separate_items_by_count
+
+try:
+    import orjson as json
+except ImportError:  # pragma: no cover
+    import json
 
 
 class SquareException(Exception):
@@ -30,11 +34,13 @@ class SquareException(Exception):
         return f"Code: {self.status_code}, Detail: {self.errors}"
 
 
-def parse_square_error_response(error: requests.exceptions.HTTPError) -> SquareException:
-    if error.response.content:
-        content = json.loads(error.response.content.decode())
+def parse_square_error_response(error: requests.exceptions.RequestException) -> Optional[SquareException]:
+    response = error.response
+    # connection errors come without response and error pages of proxies are not JSON, there is nothing to parse then
+    if response is not None and response.content and response.headers.get("Content-Type", "").startswith("application/json"):
+        content = json.loads(response.content)
         if content and "errors" in content:
-            return SquareException(error.response.status_code, content["errors"])
+            return SquareException(response.status_code, content["errors"])
 
 
 class SquareStream(HttpStream, ABC):
@@ -54,6 +60,12 @@ class SquareStream(HttpStream, ABC):
         # Because this standard is used by square in 'updated_at' records field
         self.start_date = pendulum.parse(start_date).to_rfc3339_string()
         self.include_deleted_objects = include_deleted_objects
+        # both are the same for every request of the stream
+        self._url_base = "https://connect.squareup{}.com/v2/".format("sandbox" if is_sandbox else "")
+        self._headers = {"Square-Version": api_version, "Content-Type": "application/json"}
+        # the last response and its decoded body, both parse_response and next_page_token need it
+        self._decoded_response = None
+        self._decoded_json = None
 
     data_field = None
     primary_key = "id"
@@ -61,23 +73,31 @@ class SquareStream(HttpStream, ABC):
 
     @property
     def url_base(self) -> str:
-        return "https://connect.squareup{}.com/v2/".format("sandbox" if self.is_sandbox else "")
+        return self._url_base
 
     def next_page_token(self, response: requests.Response) -> Optional[Mapping[str, Any]]:
-        next_page_cursor = response.json().get("cursor", False)
+        next_page_cursor = self._response_json(response).get("cursor", False)
         if next_page_cursor:
             return {"cursor": next_page_cursor}
 
     def request_headers(
         self, stream_state: Mapping[str, Any], stream_slice: Mapping[str, Any] = None, next_page_token: Mapping[str, Any] = None
     ) -> Mapping[str, Any]:
-        return {"Square-Version": self.api_version, "Content-Type": "application/json"}
+        # HttpStream copies headers into each request, so the same mapping can be returned every time
+        return self._headers
 
     def parse_response(self, response: requests.Response, **kwargs) -> Iterable[Mapping]:
-        json_response = response.json()
+        json_response = self._response_json(response)
         records = json_response.get(self.data_field, []) if self.data_field is not None else json_response
         yield from records
 
+    def _response_json(self, response: requests.Response) -> Any:
+        """Decode response body once, big pages (e.g. 1000 catalog objects) are expensive to decode"""
+        if response is not self._decoded_response:
+            self._decoded_json = json.loads(response.content)
+            self._decoded_response = response
+        return self._decoded_json
+
     def _send_request(self, request: requests.PreparedRequest, request_kwargs: Mapping[str, Any]) -> requests.Response:
         try:
             return super()._send_request(request, request_kwargs)
@@ -111,7 +131,7 @@ class SquareStreamPageJsonAndLimit(SquareStreamPageJson, ABC):
     ) -> Optional[Mapping]:
         json_payload = {"limit": self.items_per_page_limit}
         if next_page_token:
-            json_payload.update(next_page_token)
+            json_payload["cursor"] = next_page_token["cursor"]
 
         return json_payload
 
@@ -128,11 +148,9 @@ class SquareCatalogObjectsStream(SquareStreamPageJson):
         self, stream_state: Mapping[str, Any], stream_slice: Mapping[str, Any] = None, next_page_token: Mapping[str, Any] = None
     ) -> Optional[Mapping]:
         json_payload = super().request_body_json(stream_state, stream_slice, next_page_token)
-
-        if self.path() == "catalog/search":
-            json_payload["include_deleted_objects"] = self.include_deleted_objects
-            json_payload["include_related_objects"] = False
-            json_payload["limit"] = self.items_per_page_limit
+        json_payload["include_deleted_objects"] = self.include_deleted_objects
+        json_payload["include_related_objects"] = False
+        json_payload["limit"] = self.items_per_page_limit
 
         return json_payload
 
@@ -140,7 +158,12 @@ class SquareCatalogObjectsStream(SquareStreamPageJson):
 class IncrementalSquareGenericStream(SquareStream, ABC):
     def get_updated_state(self, current_stream_state: MutableMapping[str, Any], latest_record: Mapping[str, Any]) -> Mapping[str, Any]:
         if current_stream_state is not None and self.cursor_field in current_stream_state:
-            return {self.cursor_field: max(current_stream_state[self.cursor_field], latest_record[self.cursor_field])}
+            state_value = current_stream_state[self.cursor_field]
+            record_value = latest_record[self.cursor_field]
+            # Square returns timestamps with a varying number of fraction digits, so they can't be compared as strings
+            if parse_datetime(record_value) > parse_datetime(state_value):
+                return {self.cursor_field: record_value}
+            return {self.cursor_field: state_value}
         else:
             return {self.cursor_field: self.start_date}
 
@@ -292,7 +315,6 @@ class TeamMemberWages(SquareStreamPageParam):
 
     def request_params(self, **kwargs) -> MutableMapping[str, Any]:
         params_payload = super().request_params(**kwargs)
-        params_payload = params_payload or {}
 
         params_payload["limit"] = self.items_per_page_limit
         return params_payload
@@ -316,7 +338,6 @@ class Customers(SquareStreamPageParam):
 
     def request_params(self, **kwargs) -> MutableMapping[str, Any]:
         params_payload = super().request_params(**kwargs)
-        params_payload = params_payload or {}
 
         params_payload["sort_order"] = "ASC"
         params_payload["sort_field"] = "CREATED_AT"
@@ -338,7 +359,6 @@ class Orders(SquareStreamPageJson):
 
     def request_body_json(self, stream_slice: Mapping[str, Any] = None, **kwargs) -> Optional[Mapping]:
         json_payload = super().request_body_json(stream_slice=stream_slice, **kwargs)
-        json_payload = json_payload or {}
 
         if stream_slice:
             json_payload.update(stream_slice)
@@ -2,8 +2,11 @@
 # Copyright (c) 2022 Airbyte, Inc., all rights reserved.
 #
 
+from functools import lru_cache
 from typing import Union
 
+import pendulum
+
 
 def separate_by_count(total_length: int, part_count: int) -> (int, int):
     """
@@ -33,3 +36,12 @@ def separate_items_by_count(item_list: Union[list, tuple], part_count: int) -> l
         result_list.append(item_list[total_parts * part_count :])
 
     return result_list
+
+
+@lru_cache(maxsize=1024)
+def parse_datetime(value: str) -> pendulum.DateTime:
+    """
+    Parses RFC 3339 datetime string, the cached result is shared by all callers
+    The state value is the same for many records, so it is parsed only once
+    """
+    return pendulum.parse(value)
@@ -0,0 +1,106 @@
+#
+# Copyright (c) 2022 Airbyte, Inc., all rights reserved.
+#
+
+from unittest.mock import MagicMock, patch
+
+import pytest
+import requests
+from source_square import source
+from source_square.source import Items, Locations, Payments, TeamMembers, parse_square_error_response
+
+
+@pytest.fixture(name="stream_args")
+def stream_args_fixture():
+    return {
+        "authenticator": None,
+        "is_sandbox": True,
+        "api_version": "2021-09-15",
+        "start_date": "2021-06-01",
+        "include_deleted_objects": False,
+    }
+
+
+def test_response_decoded_once(stream_args):
+    stream = Locations(**stream_args)
+    response = MagicMock(content=b'{"locations": [{"id": "1"}, {"id": "2"}], "cursor": "next"}')
+
+    with patch.object(source, "json", wraps=source.json) as json_mock:
+        assert list(stream.parse_response(response)) == [{"id": "1"}, {"id": "2"}]
+        assert stream.next_page_token(response) == {"cursor": "next"}
+    assert json_mock.loads.call_count == 1
+
+
+def test_parse_square_error_response():
+    response = MagicMock(
+        status_code=401,
+        headers={"Content-Type": "application/json"},
+        content=b'{"errors": [{"category": "AUTHENTICATION_ERROR", "detail": "Unauthorized"}]}',
+    )
+
+    square_exception = parse_square_error_response(requests.exceptions.HTTPError(response=response))
+    assert square_exception.status_code == 401
+    assert square_exception.errors == [{"category": "AUTHENTICATION_ERROR", "detail": "Unauthorized"}]
+
+
+def test_parse_square_error_response_without_response():
+    assert parse_square_error_response(requests.exceptions.HTTPError(response=None)) is None
+
+
+def test_parse_square_error_response_not_json():
+    response = MagicMock(status_code=502, headers={"Content-Type": "text/html"}, content=b"<html>Bad Gateway</html>")
+
+    assert parse_square_error_response(requests.exceptions.HTTPError(response=response)) is None
+
+
+@pytest.mark.parametrize(
+    "is_sandbox,url_base", [(True, "https://connect.squareupsandbox.com/v2/"), (False, "https://connect.squareup.com/v2/")]
+)
+def test_url_base_and_headers(stream_args, is_sandbox, url_base):
+    stream = Locations(**{**stream_args, "is_sandbox": is_sandbox})
+
+    assert stream.url_base == url_base
+    assert stream.request_headers(stream_state={}) == {"Square-Version": "2021-09-15", "Content-Type": "application/json"}
+
+
+def test_incremental_stream_request_params_keep_cursor(stream_args):
+    stream = Payments(**stream_args)
+
+    params = stream.request_params(stream_state={"created_at": "2021-06-01T00:00:00Z"}, next_page_token={"cursor": "next"})
+    assert params == {"cursor": "next", "begin_time": "2021-06-01T00:00:00Z", "limit": 100, "sort_order": "ASC"}
+
+
+def test_catalog_stream_request_body_json(stream_args):
+    stream = Items(**stream_args)
+
+    body = stream.request_body_json(stream_state={"updated_at": "2021-06-01T00:00:00Z"}, next_page_token={"cursor": "next"})
+    assert body == {
+        "cursor": "next",
+        "include_deleted_objects": False,
+        "include_related_objects": False,
+        "limit": 1000,
+        "begin_time": "2021-06-01T00:00:00Z",
+        "object_types": ["ITEM"],
+    }
+
+
+def test_page_json_and_limit_request_body_json(stream_args):
+    stream = TeamMembers(**stream_args)
+
+    assert stream.request_body_json(stream_state={}) == {"limit": 100}
+    assert stream.request_body_json(stream_state={}, next_page_token={"cursor": "next"}) == {"limit": 100, "cursor": "next"}
+
+
+@pytest.mark.parametrize(
+    "state_value,record_value,expected",
+    [
+        ("2021-06-14T13:47:56Z", "2021-06-14T13:47:56.799Z", "2021-06-14T13:47:56.799Z"),
+        ("2021-06-14T13:47:56.799Z", "2021-06-14T13:47:56Z", "2021-06-14T13:47:56.799Z"),
+        ("2021-06-14T13:47:56.799Z", "2021-06-15T00:00:00.1Z", "2021-06-15T00:00:00.1Z"),
+    ],
+)
+def test_incremental_stream_get_updated_state(stream_args, state_value, record_value, expected):
+    stream = Payments(**stream_args)
+
+    state = stream.get_updated_state({"created_at": state_value}, {"created_at": record_value})
+    assert state == {"created_at": expected}
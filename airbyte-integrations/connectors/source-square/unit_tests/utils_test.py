@@ -4,8 +4,9 @@
 
 import math
 
+import pendulum
 import pytest
-from source_square.utils import separate_by_count, separate_items_by_count
+from source_square.utils import parse_datetime, separate_by_count, separate_items_by_count
 
 
 def test_separate_by_count():
@@ -63,3 +64,8 @@ def test_separate_items_by_count():
 
     result_list = separate_items_by_count(item_list=None, part_count=5)
     assert result_list == []
+
+
+def test_parse_datetime():
+    assert parse_datetime("2021-06-14T13:47:56.799Z") == pendulum.datetime(2021, 6, 14, 13, 47, 56, 799000)
+    assert parse_datetime("2021-06-14T13:47:56Z") < parse_datetime("2021-06-14T13:47:56.799Z")